@@ -1,19 +1,23 @@
+from importlib import import_module
 from importlib.metadata import version
+from typing import TYPE_CHECKING, Any
 
-from .agent import Agent, capture_run_messages
-from .exceptions import (
-    AgentRunError,
-    ModelRetry,
-    UnexpectedModelBehavior,
-    UsageLimitExceeded,
-    UserError,
-)
-from .serve import SuggestedAction, serve_agent
-from .tools import RunContext, Tool
+if TYPE_CHECKING:
+    from .agent import Agent, capture_run_messages
+    from .exceptions import (
+        AgentRunError,
+        ModelRetry,
+        UnexpectedModelBehavior,
+        UsageLimitExceeded,
+        UserError,
+    )
+    from .serve import SuggestedAction, run_agent, serve_agent
+    from .tools import RunContext, Tool
 
 __all__ = (
     "SuggestedAction",
     "serve_agent",
+    "run_agent",
     "Agent",
     "capture_run_messages",
     "RunContext",
@@ -24,3 +28,49 @@ __all__ = (
     "UsageLimitExceeded",
     "UserError",
 )
+
+_LAZY_IMPORTS = {
+    "SuggestedAction": ".serve",
+    "serve_agent": ".serve",
+    "run_agent": ".serve",
+    "Agent": ".agent",
+    "capture_run_messages": ".agent",
+    "RunContext": ".tools",
+    "Tool": ".tools",
+    "AgentRunError": ".exceptions",
+    "ModelRetry": ".exceptions",
+    "UnexpectedModelBehavior": ".exceptions",
+    "UsageLimitExceeded": ".exceptions",
+    "UserError": ".exceptions",
+}
+"""Module each public name is imported from, on first access, so importing `liquid_os` stays cheap."""
+
+_LAZY_SUBMODULES = frozenset(
+    {
+        "agent",
+        "exceptions",
+        "messages",
+        "models",
+        "result",
+        "serve",
+        "settings",
+        "tools",
+        "usage",
+    }
+)
+"""Submodules that used to be imported eagerly, so are still reachable as attributes, e.g. `liquid_os.agent`."""
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_SUBMODULES:
+        value = import_module(f".{name}", __name__)
+    elif name in _LAZY_IMPORTS:
+        value = getattr(import_module(_LAZY_IMPORTS[name], __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
@@ -1,9 +1,10 @@
+from collections import OrderedDict
 from enum import Enum
-from typing import List, Optional, Tuple
+from typing import Hashable, Iterator, List, Optional, Tuple
 
+import msgspec
 from openai.types import chat
 from openai.types.chat.chat_completion_message_param import ChatCompletionMessageParam
-from pydantic import BaseModel
 
 from ._schema import ClientMessage
 from .messages import (
@@ -25,142 +26,150 @@ class ToolInvocationState(str, Enum):
     RESULT = "result"
 
 
-class ToolCall(BaseModel):
-    toolCallId: str
-    toolName: str
-    args: dict
-    state: Optional[str] = None
-    result: Optional[str] = None
-
-
-async def add_context(ctx: RunContext) -> str:
-    """Add context to the conversation."""
-    return """You are a helpful AI assistant that can help users with various tasks.
+_CONTEXT = """You are a helpful AI assistant that can help users with various tasks.
     You can get weather information and ask for user confirmation when needed.
     Always ask for confirmation before accessing user's location."""
 
 
-def convert_messages(
-    messages: List[ClientMessage],
-) -> List[chat.ChatCompletionMessageParam]:
-    """Convert client messages to a format suitable for the agent."""
-    openai_messages = []
-
-    for msg in messages:
-        message: chat.ChatCompletionMessageParam = {
-            "role": msg.role,
-            "content": msg.content,
-        }
-
-        if msg.toolInvocations:
-            for tool in msg.toolInvocations:
-                tool_message: chat.ChatCompletionToolMessageParam = {
-                    "role": "tool",
-                    "tool_call_id": tool.get("id", ""),
-                    "name": tool.get("toolName", ""),
-                    "content": str(tool.get("result", "")),
-                }
-                openai_messages.append(tool_message)
-
-        openai_messages.append(message)
-
-    return openai_messages
+async def add_context(ctx: RunContext) -> str:
+    """Add context to the conversation."""
+    return _CONTEXT
 
 
 def convert_to_openai_messages(
     messages: List[ClientMessage],
 ) -> List[ChatCompletionMessageParam]:
     """Convert client messages to OpenAI message format."""
-    openai_messages = []
-
-    for message in messages:
-        msg_dict: chat.ChatCompletionMessageParam = {
-            "role": message.role,
-            "content": message.content,
-        }
-
-        if message.toolInvocations:
-            tool_calls: List[chat.ChatCompletionMessageToolCallParam] = []
-            for tool in message.toolInvocations:
-                if tool.get("state") == "result":
-                    tool_calls.append(
-                        {
-                            "id": tool["toolCallId"],
-                            "type": "function",
-                            "function": {
-                                "name": tool["toolName"],
-                                "arguments": tool.get("args", "{}"),
-                            },
-                        }
-                    )
-            if tool_calls:
-                msg_dict["tool_calls"] = tool_calls
-
-            tool_results = []
-            for tool in message.toolInvocations:
-                if tool.get("result"):
-                    tool_results.append(
-                        {
-                            "tool_call_id": tool["toolCallId"],
-                            "role": "tool",
+    return [m for message in messages for m in _expand_openai_message(message)]
+
+
+def _expand_openai_message(
+    message: ClientMessage,
+) -> Iterator[ChatCompletionMessageParam]:
+    """Yield the tool results of a client message, followed by the message with its tool calls."""
+    msg_dict: chat.ChatCompletionMessageParam = {
+        "role": message.role,
+        "content": message.content,
+    }
+
+    if message.toolInvocations:
+        tool_calls: List[chat.ChatCompletionMessageToolCallParam] = []
+        for tool in message.toolInvocations:
+            if tool.get("state") == "result":
+                tool_calls.append(
+                    {
+                        "id": tool["toolCallId"],
+                        "type": "function",
+                        "function": {
                             "name": tool["toolName"],
-                            "content": str(tool["result"]),
-                        }
-                    )
-            openai_messages.extend(tool_results)
-
-        openai_messages.append(msg_dict)
+                            "arguments": tool.get("args", "{}"),
+                        },
+                    }
+                )
+            if tool.get("result"):
+                yield {
+                    "tool_call_id": tool["toolCallId"],
+                    "role": "tool",
+                    "name": tool["toolName"],
+                    "content": str(tool["result"]),
+                }
+        if tool_calls:
+            msg_dict["tool_calls"] = tool_calls
 
-    return openai_messages
+    yield msg_dict
 
 
 def convert_to_model_messages(
     messages: List[ClientMessage],
 ) -> Tuple[Optional[str], List[ModelMessage]]:
-    """Convert client messages to Liquid OS model messages and extract user prompt if last message is from user."""
-    model_messages = []
-    user_prompt = None
-
-    for msg in messages:
-        if msg.role == "user":
-            model_messages.append(
-                ModelRequest(parts=[UserPromptPart(content=msg.content)])
-            )
-            # Store user prompt if this is the last message
-            if msg == messages[-1]:
-                user_prompt = msg.content
-        elif msg.role == "assistant":
-            parts = []
-            tool_returns = []
-            if msg.toolInvocations:
-                for tool in msg.toolInvocations:
-                    if tool.get("state") == "result":
-                        parts.append(
-                            ToolCallPart(
-                                tool_name=tool["toolName"],
-                                args=ArgsDict(args_dict=tool["args"]),
-                                tool_call_id=tool["toolCallId"],
-                            )
+    """Convert client messages to Liquid OS model messages and extract user prompt if last message is from user.
+
+    The messages have already been validated when the request body was decoded, and the message types are plain
+    dataclasses, so they are built directly without any further validation.
+    """
+    # Use the last message as the user prompt if it is from the user
+    user_prompt = (
+        messages[-1].content if messages and messages[-1].role == "user" else None
+    )
+    model_messages = [m for msg in messages for m in _cached_model_messages(msg)]
+    return user_prompt, model_messages
+
+
+_MESSAGE_CACHE_SIZE = 4096
+_message_cache: OrderedDict[Hashable, List[ModelMessage]] = OrderedDict()
+"""LRU cache of converted model messages, keyed by `_message_key`.
+
+Clients send the whole conversation on every turn, so most messages have already been converted. The cached
+messages are shared between requests and must not be mutated.
+"""
+
+
+def _message_key(msg: ClientMessage) -> Hashable:
+    """Key identifying everything about a client message that affects its conversion.
+
+    Tool invocations are included in full since a message keeps its id when a tool call gets its result, args and
+    results are serialized as they may be unhashable. msgspec is used since it encodes anything it decoded from the
+    request, including integers wider than 64 bits and deeply nested values.
+    """
+    tools = tuple(
+        (
+            tool.get("toolCallId"),
+            tool.get("toolName"),
+            tool.get("state"),
+            msgspec.json.encode(tool.get("args"), order="sorted"),
+            msgspec.json.encode(tool.get("result"), order="sorted"),
+        )
+        for tool in msg.toolInvocations or ()
+    )
+    return msg.id, msg.role, msg.content, tools
+
+
+def _cached_model_messages(msg: ClientMessage) -> List[ModelMessage]:
+    key = _message_key(msg)
+    converted = _message_cache.get(key)
+    if converted is None:
+        converted = _message_cache[key] = _to_model_messages(msg)
+        if len(_message_cache) > _MESSAGE_CACHE_SIZE:
+            _message_cache.popitem(last=False)
+    else:
+        _message_cache.move_to_end(key)
+    return converted
+
+
+def _to_model_messages(msg: ClientMessage) -> List[ModelMessage]:
+    """Convert a single client message to model messages."""
+    if msg.role == "user":
+        return [ModelRequest(parts=[UserPromptPart(content=msg.content)])]
+    elif msg.role == "assistant":
+        parts = []
+        tool_returns = []
+        if msg.toolInvocations:
+            for tool in msg.toolInvocations:
+                if tool.get("state") == "result":
+                    parts.append(
+                        ToolCallPart(
+                            tool_name=tool["toolName"],
+                            args=ArgsDict(args_dict=tool["args"]),
+                            tool_call_id=tool["toolCallId"],
                         )
-                        # Store tool returns to add after ModelResponse
-                        tool_returns.append(
-                            ModelRequest(
-                                parts=[
-                                    ToolReturnPart(
-                                        tool_name=tool["toolName"],
-                                        tool_call_id=tool["toolCallId"],
-                                        content=str(tool["result"]),
-                                    )
-                                ]
-                            )
+                    )
+                    # Store tool returns to add after ModelResponse
+                    tool_returns.append(
+                        ModelRequest(
+                            parts=[
+                                ToolReturnPart(
+                                    tool_name=tool["toolName"],
+                                    tool_call_id=tool["toolCallId"],
+                                    content=str(tool["result"]),
+                                )
+                            ]
                         )
+                    )
 
-            if not parts and msg.content:
-                parts.append(TextPart(content=msg.content))
-
-            if parts:  # Add ModelResponse if there are parts
-                model_messages.append(ModelResponse(parts=parts, kind="response"))
-                # Add any tool returns after the ModelResponse
-                model_messages.extend(tool_returns)
+        if not parts and msg.content:
+            parts.append(TextPart(content=msg.content))
 
-    return user_prompt, model_messages
+        if parts:  # Add ModelResponse if there are parts
+            # Add any tool returns after the ModelResponse
+            return [ModelResponse(parts=parts), *tool_returns]
+    return []
@@ -1,11 +1,12 @@
 from typing import Any, Dict, List, Optional
 
+import msgspec
 from pydantic import BaseModel
 
 from .messages import ArgsDict, ArgsJson
 
 
-class ClientMessage(BaseModel):
+class ClientMessage(msgspec.Struct, kw_only=True, omit_defaults=True):
     id: Optional[str] = None
     role: str
     content: str
@@ -13,8 +14,17 @@ class ClientMessage(BaseModel):
     experimental_attachments: Optional[List[Dict[str, Any]]] = None
 
 
+class RequestSchema(msgspec.Struct, omit_defaults=True):
+    """Body of a `/api/chat` request."""
+
+    messages: List[ClientMessage]
+
+
 class ToolCallRequest(BaseModel):
-    """Used to indicate a tool call that should be handled by the frontend."""
+    """Used to indicate a tool call that should be handled by the frontend.
+
+    This stays a Pydantic model since it is used as an agent `result_type`, which needs a JSON schema.
+    """
 
     toolCallId: str
     toolName: str
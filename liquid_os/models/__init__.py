@@ -7,11 +7,12 @@ specific LLM being used.
 from __future__ import annotations as _annotations
 
 from abc import ABC, abstractmethod
-from collections.abc import AsyncIterator, Iterator
+from collections.abc import AsyncIterator, Callable, Iterator
 from contextlib import asynccontextmanager, contextmanager
 from dataclasses import dataclass, field
 from datetime import datetime
-from functools import cache
+from functools import cache, lru_cache
+from importlib import import_module
 from typing import TYPE_CHECKING, Literal
 
 import httpx
@@ -230,64 +231,81 @@ def override_allow_model_requests(allow_model_requests: bool) -> Iterator[None]:
         ALLOW_MODEL_REQUESTS = old_value  # pyright: ignore[reportConstantRedefinition]
 
 
-def infer_model(model: Model | KnownModelName) -> Model:
-    """Infer the model from the name."""
-    if isinstance(model, Model):
-        return model
-    elif model == "test":
-        from .test import TestModel
+def _lazy_loader(module: str, class_name: str) -> Callable[[str], Model]:
+    """Return a function building `class_name` from the relative `module`, which is only imported on first use."""
+    model_cls: Callable[[str], Model] | None = None
 
-        return TestModel()
-    elif model.startswith("openai:"):
-        from .openai import OpenAIModel
+    def load(model_name: str) -> Model:
+        nonlocal model_cls
+        cls = model_cls
+        if cls is None:
+            cls = model_cls = getattr(import_module(module, __package__), class_name)
+        return cls(model_name)
 
-        return OpenAIModel(model[7:])
-    elif model.startswith(("gpt", "o1")):
-        from .openai import OpenAIModel
+    return load
 
-        return OpenAIModel(model)
-    elif model.startswith("google-gla"):
-        from .gemini import GeminiModel
 
-        return GeminiModel(model[11:])  # pyright: ignore[reportArgumentType]
-    # backwards compatibility with old model names (ex, gemini-1.5-flash -> google-gla:gemini-1.5-flash)
-    elif model.startswith("gemini"):
-        from .gemini import GeminiModel
+_openai_model = _lazy_loader(".openai", "OpenAIModel")
+_gemini_model = _lazy_loader(".gemini", "GeminiModel")
+_vertexai_model = _lazy_loader(".vertexai", "VertexAIModel")
+_anthropic_model = _lazy_loader(".anthropic", "AnthropicModel")
 
-        # noinspection PyTypeChecker
-        return GeminiModel(model)  # pyright: ignore[reportArgumentType]
-    elif model.startswith("groq:"):
-        from .groq import GroqModel
+_SCHEME_LOADERS: dict[str, Callable[[str], Model]] = {
+    "openai": _openai_model,
+    "google-gla": _gemini_model,
+    "google-vertex": _vertexai_model,
+    # backwards compatibility with old model names (ex, vertexai:gemini-1.5-flash -> google-vertex:gemini-1.5-flash)
+    "vertexai": _vertexai_model,
+    "groq": _lazy_loader(".groq", "GroqModel"),
+    "mistral": _lazy_loader(".mistral", "MistralModel"),
+    "ollama": _lazy_loader(".ollama", "OllamaModel"),
+    "anthropic": _anthropic_model,
+}
+"""Model loaders keyed by the `<scheme>:` prefix of a model name, called with the rest of the name.
+
+Every scheme used in [`KnownModelName`][liquid_os.models.KnownModelName] must have an entry here, which is checked
+by the tests.
+"""
 
-        return GroqModel(model[5:])  # pyright: ignore[reportArgumentType]
-    elif model.startswith("google-vertex"):
-        from .vertexai import VertexAIModel
+_LEGACY_LOADERS: tuple[tuple[str, Callable[[str], Model]], ...] = (
+    ("gpt", _openai_model),
+    ("o1", _openai_model),
+    # backwards compatibility with old model names (ex, gemini-1.5-flash -> google-gla:gemini-1.5-flash)
+    ("gemini", _gemini_model),
+    # backwards compatibility with old model names (ex, claude-3-5-sonnet-latest -> anthropic:claude-3-5-sonnet-latest)
+    ("claude", _anthropic_model),
+)
+"""Model loaders for names without a scheme, matched on prefix and called with the full name."""
 
-        return VertexAIModel(model[14:])  # pyright: ignore[reportArgumentType]
-    # backwards compatibility with old model names (ex, vertexai:gemini-1.5-flash -> google-vertex:gemini-1.5-flash)
-    elif model.startswith("vertexai:"):
-        from .vertexai import VertexAIModel
 
-        return VertexAIModel(model[9:])  # pyright: ignore[reportArgumentType]
-    elif model.startswith("mistral:"):
-        from .mistral import MistralModel
+def infer_model(model: Model | KnownModelName) -> Model:
+    """Infer the model from the name."""
+    if isinstance(model, Model):
+        return model
+    elif model == "test":
+        # `TestModel` records state about its last request, so each agent gets its own instance
+        from .test import TestModel
 
-        return MistralModel(model[8:])
-    elif model.startswith("ollama:"):
-        from .ollama import OllamaModel
+        return TestModel()
+    else:
+        return _resolve_model(model)
 
-        return OllamaModel(model[7:])
-    elif model.startswith("anthropic"):
-        from .anthropic import AnthropicModel
 
-        return AnthropicModel(model[10:])
-    # backwards compatibility with old model names (ex, claude-3-5-sonnet-latest -> anthropic:claude-3-5-sonnet-latest)
-    elif model.startswith("claude"):
-        from .anthropic import AnthropicModel
+@lru_cache(maxsize=64)
+def _resolve_model(model: str) -> Model:
+    loader, model_name = _find_loader(model)
+    return loader(model_name)
 
-        return AnthropicModel(model)
-    else:
-        raise UserError(f"Unknown model: {model}")
+
+def _find_loader(model: str) -> tuple[Callable[[str], Model], str]:
+    """Find the loader for a model name, and the name to call it with, without loading anything."""
+    scheme, sep, model_name = model.partition(":")
+    if sep and (loader := _SCHEME_LOADERS.get(scheme)) is not None:
+        return loader, model_name
+    for prefix, loader in _LEGACY_LOADERS:
+        if model.startswith(prefix):
+            return loader, model
+    raise UserError(f"Unknown model: {model}")
 
 
 @cache
@@ -300,15 +318,23 @@ def cached_async_http_client(timeout: int = 600, connect: int = 5) -> httpx.Asyn
 
     The default timeouts match those of OpenAI,
     see <https://github.com/openai/openai-python/blob/v1.54.4/src/openai/_constants.py#L9>.
+
+    HTTP/2 is enabled so concurrent requests to the same provider are multiplexed over a single connection.
     """
     return httpx.AsyncClient(
+        http2=True,
         timeout=httpx.Timeout(timeout=timeout, connect=connect),
-        headers={"User-Agent": get_user_agent()},
+        limits=httpx.Limits(
+            max_connections=200, max_keepalive_connections=100, keepalive_expiry=30
+        ),
+        headers=_DEFAULT_HEADERS,
     )
 
 
-@cache
+_USER_AGENT = "liquid-os/0.0.1"
+_DEFAULT_HEADERS = {"User-Agent": _USER_AGENT}
+
+
 def get_user_agent() -> str:
     """Get the user agent string for the HTTP client."""
-
-    return f"liquid-os/0.0.1"
+    return _USER_AGENT
@@ -1,15 +1,22 @@
-import json
+import asyncio
 import logging
-from typing import AsyncIterator, List
+import re
+import weakref
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple, Union
 
-from fastapi import FastAPI, Query
-from fastapi.responses import StreamingResponse
-from pydantic import BaseModel
+import msgspec
+import orjson
+from fastapi import FastAPI, Query, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, TypeAdapter
 
 from ._client_prompt import convert_to_model_messages
-from ._schema import ClientMessage, ToolCallRequest
+from ._schema import ClientMessage, RequestSchema, ToolCallRequest
 from .agent import Agent
-from .messages import ArgsDict
+from .exceptions import UserError
+from .messages import ArgsDict, ModelMessage
+from .result import RunResult
 
 # load_dotenv(".env.local")
 # logfire.configure()
@@ -17,14 +24,164 @@ from .messages import ArgsDict
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_DECODER = msgspec.json.Decoder(RequestSchema)
 
-class RequestSchema(BaseModel):
-    messages: List[ClientMessage]
+(_REQUEST_SCHEMA,), _REQUEST_COMPONENTS = msgspec.json.schema_components(
+    [RequestSchema], ref_template="#/components/schemas/{name}"
+)
+"""OpenAPI schema of the `/api/chat` body, which FastAPI can't infer since the body is decoded by msgspec."""
+
+_MSGSPEC_PATH_RE = re.compile(r"\.([^.\[]+)|\[(\d+)\]")
+_MSGSPEC_BYTE_RE = re.compile(r"\(byte (\d+)\)$")
+
+
+def _request_validation_error(
+    error: msgspec.DecodeError, body: bytes
+) -> RequestValidationError:
+    """Convert a msgspec decoding error to the error FastAPI raises for an invalid Pydantic body.
+
+    This keeps the `422` response with a list of `type`/`loc`/`msg` errors that clients already handle.
+    """
+    if not body:
+        return RequestValidationError(
+            [
+                {
+                    "type": "missing",
+                    "loc": ("body",),
+                    "msg": "Field required",
+                    "input": None,
+                }
+            ]
+        )
+    message = str(error)
+    if not isinstance(error, msgspec.ValidationError):
+        match = _MSGSPEC_BYTE_RE.search(message)
+        return RequestValidationError(
+            [
+                {
+                    "type": "json_invalid",
+                    "loc": ("body", int(match.group(1))) if match else ("body",),
+                    "msg": "JSON decode error",
+                    "input": {},
+                    "ctx": {"error": message},
+                }
+            ]
+        )
+
+    # msgspec messages look like "Expected `str`, got `int` - at `$.messages[0].role`"
+    message, _, path = message.partition(" - at `$")
+    loc: List[Any] = ["body"]
+    loc.extend(
+        int(index) if index else key
+        for key, index in _MSGSPEC_PATH_RE.findall(path.rstrip("`"))
+    )
+    error_type = "value_error"
+    if missing := re.match(r"Object missing required field `(.+)`$", message):
+        error_type = "missing"
+        loc.append(missing.group(1))
+    return RequestValidationError(
+        [{"type": error_type, "loc": tuple(loc), "msg": message}]
+    )
+
+
+_TEXT_PREFIX = b"0:"
+_TOOL_CALL_PREFIX = b"9:"
+_FINISH_TEMPLATE = (
+    b'e:{"finishReason":"stop","usage":{"promptTokens":%d,"completionTokens":%d},'
+    b'"isContinued":false}\n'
+)
+"""Finish message of the data stream protocol, formatted with the prompt and completion token counts."""
+
+
+_PendingRun = Tuple[Optional[str], List[ModelMessage], "asyncio.Future[RunResult[Any]]"]
+"""A run waiting in `_BatchGate`: the user prompt, message history, and future for the run's result."""
+
+
+class _BatchGate:
+    """Collects agent runs submitted within a short window and starts them together.
+
+    This trades up to `window` seconds of latency per request for bursts of concurrent model calls.
+
+    If the agent has a `run_batch` method, e.g. one backed by a model with batched inference, it is called once per
+    batch with a list of `(user_prompt, message_history)` pairs, and must return a result (or exception) for each pair,
+    in order. Otherwise the runs are started concurrently with `agent.run`.
+    """
+
+    def __init__(self, agent: Agent, window: float):
+        self.agent = agent
+        self.window = window
+        self._pending: List[_PendingRun] = []
+        self._drain_task: Optional[asyncio.Task[None]] = None
+
+    async def run(
+        self, user_prompt: Optional[str], message_history: List[ModelMessage]
+    ) -> RunResult[Any]:
+        future: asyncio.Future[RunResult[Any]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending.append((user_prompt, message_history, future))
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain())
+        return await future
+
+    async def _drain(self) -> None:
+        await asyncio.sleep(self.window)
+        batch, self._pending = self._pending, []
+        self._drain_task = None
+        logger.info(f"Running batch of {len(batch)} agent runs")
+        try:
+            results = await self._run_batch(batch)
+            if len(results) != len(batch):
+                raise UserError(
+                    f"`run_batch` returned {len(results)} results for a batch of {len(batch)} runs"
+                )
+            for (_, _, future), result in zip(batch, results):
+                # the request may have been cancelled while waiting, e.g. if the client disconnected
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # e.g. if the drain task itself was cancelled, no request should be left waiting forever
+            for _, _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+    async def _run_batch(
+        self, batch: List[_PendingRun]
+    ) -> Sequence[Union[RunResult[Any], BaseException]]:
+        run_batch = getattr(self.agent, "run_batch", None)
+        if run_batch is not None:
+            return await run_batch(
+                [
+                    (user_prompt, message_history)
+                    for user_prompt, message_history, _ in batch
+                ]
+            )
+        return await asyncio.gather(
+            *(
+                self.agent.run(
+                    user_prompt=user_prompt,
+                    message_history=message_history,
+                    infer_name=False,
+                )
+                for user_prompt, message_history, _ in batch
+            ),
+            return_exceptions=True,
+        )
 
 
 async def stream_response(
-    agent: Agent, messages: List[ClientMessage]
-) -> AsyncIterator[str]:
+    agent: Agent,
+    messages: List[ClientMessage],
+    batch_gate: Optional[_BatchGate] = None,
+) -> AsyncIterator[bytes]:
     """Stream the chat response."""
     logger.info(f"Received {len(messages)} messages")
     if not messages:
@@ -34,40 +191,47 @@ async def stream_response(
     logger.info("Converting messages to model format...")
     user_prompt, message_history = convert_to_model_messages(messages)
 
-    print("Running agent with user_prompt:")
-    print(user_prompt)
-    print("message_history:")
-    print(message_history)
-
-    # Use run instead of run_sync for async context
-    result = await agent.run(
-        user_prompt=user_prompt, message_history=message_history, infer_name=False
+    # lazy %-formatting, so the message history is only rendered when debug logging is enabled
+    logger.debug(
+        "Running agent with user_prompt: %r, message_history: %r",
+        user_prompt,
+        message_history,
     )
 
-    print(f"Received response: {result.data}, type: {type(result.data)}")
+    if batch_gate is not None:
+        result = await batch_gate.run(user_prompt, message_history)
+    else:
+        # Use run instead of run_sync for async context
+        result = await agent.run(
+            user_prompt=user_prompt, message_history=message_history, infer_name=False
+        )
+
+    logger.debug("Received response: %r, type: %s", result.data, type(result.data))
 
     # Handle ToolCallRequest
     if isinstance(result.data, ToolCallRequest):
-        print(f"Tool call request: {result.data.toolName}")
-        yield '9:{{"toolCallId":"{id}","toolName":"{name}","args":{args}}}\n'.format(
-            id=result.data.toolCallId,
-            name=result.data.toolName,
-            args=json.dumps(result.data.args.args_dict)
+        logger.info(f"Tool call request: {result.data.toolName}")
+        args = (
+            result.data.args.args_dict
             if isinstance(result.data.args, ArgsDict)
-            else result.data.args.args_json,
+            else orjson.Fragment(result.data.args.args_json)
         )
+        tool_call = {
+            "toolCallId": result.data.toolCallId,
+            "toolName": result.data.toolName,
+            "args": args,
+        }
+        yield _TOOL_CALL_PREFIX + orjson.dumps(tool_call) + b"\n"
     # Handle string responses
     elif isinstance(result.data, str):
         logger.info(f"Text response: {result.data[:50]}...")
-        yield "0:{text}\n".format(text=json.dumps(result.data))
+        yield _TEXT_PREFIX + orjson.dumps(result.data) + b"\n"
     else:
-        print(f"Unknown response type: {type(result.data)}")
+        logger.warning(f"Unknown response type: {type(result.data)}")
 
     # Send final usage stats
     logger.info("Sending final usage stats...")
-    yield 'e:{{"finishReason":"stop","usage":{{"promptTokens":{prompt},"completionTokens":{completion}}},"isContinued":false}}\n'.format(
-        prompt=100, completion=100
-    )
+    yield _FINISH_TEMPLATE % (100, 100)
 
 
 class SuggestedAction(BaseModel):
@@ -76,19 +240,123 @@ class SuggestedAction(BaseModel):
     action: str
 
 
-def serve_agent(agent: Agent, suggestions: List[SuggestedAction] = []):
+_SUGGESTIONS_ADAPTER = TypeAdapter(List[SuggestedAction])
+"""Serializes the suggested actions served by `/api/suggestions`, built once rather than on every `serve_agent` call."""
+
+_apps: Dict[int, Tuple[Tuple[Any, ...], "weakref.ref[FastAPI]"]] = {}
+"""Apps built by `serve_agent` and the options they were built with, keyed by agent id.
+
+Neither the agent nor the app is kept alive by this registry: the app is held weakly, since it references the agent,
+and the entry is removed when the agent is garbage collected, so its id can't be reused by another agent.
+"""
+
+
+def serve_agent(
+    agent: Agent,
+    suggestions: List[SuggestedAction] = [],
+    *,
+    batch: bool = False,
+    batch_window: float = 0.1,
+) -> FastAPI:
+    """Build a FastAPI app serving the agent.
+
+    While the app returned by a previous call for the same agent, with the same options, is still alive, that
+    same app is returned, so changes made to it (e.g. with `add_middleware`) are shared by every caller.
+
+    Args:
+        agent: The agent to serve.
+        suggestions: Suggested actions returned by `/api/suggestions`. They are serialized when the app is built,
+            so later changes to them are only served by apps built by later calls.
+        batch: Whether to collect concurrent `/api/chat` requests and run them together.
+        batch_window: How long, in seconds, to collect requests for a batch when `batch` is enabled.
+    """
+    # suggestions are serialized up front, so the app is rebuilt if they have changed since, even in place
+    suggestions_json = _SUGGESTIONS_ADAPTER.dump_json(suggestions)
+    options = (suggestions_json, batch, batch_window)
+    key = id(agent)
+    cached = _apps.get(key)
+    if cached is not None and cached[0] == options:
+        app = cached[1]()
+        if app is not None:
+            return app
+    if cached is None:
+        weakref.finalize(agent, _apps.pop, key, None)
+    batch_gate = _BatchGate(agent, batch_window) if batch else None
+    app = _build_app(agent, suggestions_json, batch_gate)
+    _apps[key] = (options, weakref.ref(app))
+    return app
+
+
+def _build_app(
+    agent: Agent,
+    suggestions_json: bytes,
+    batch_gate: Optional[_BatchGate],
+) -> FastAPI:
     app = FastAPI()
 
-    @app.post("/api/chat")
-    async def handle_chat_data(request: RequestSchema, protocol: str = Query("data")):
+    @app.post(
+        "/api/chat",
+        openapi_extra={
+            "requestBody": {
+                "required": True,
+                "content": {"application/json": {"schema": _REQUEST_SCHEMA}},
+            }
+        },
+    )
+    async def handle_chat_data(request: Request, protocol: str = Query("data")):
         logger.info(f"Received chat request with protocol: {protocol}")
-        response = StreamingResponse(stream_response(agent, request.messages))
+        raw = await request.body()
+        try:
+            body = _DECODER.decode(raw)
+        except msgspec.DecodeError as e:
+            raise _request_validation_error(e, raw) from e
+        response = StreamingResponse(stream_response(agent, body.messages, batch_gate))
         response.headers["x-vercel-ai-data-stream"] = "v1"
         logger.info("Returning streaming response")
         return response
 
     @app.get("/api/suggestions", response_model=List[SuggestedAction])
     async def get_suggestions():
-        return suggestions
+        return Response(suggestions_json, media_type="application/json")
+
+    def openapi() -> Dict[str, Any]:
+        if app.openapi_schema is not None:
+            return app.openapi_schema
+        schema = FastAPI.openapi(app)
+        components = schema.setdefault("components", {})
+        components.setdefault("schemas", {}).update(_REQUEST_COMPONENTS)
+        return schema
 
+    app.openapi = openapi
     return app
+
+
+def run_agent(
+    agent: Agent,
+    suggestions: List[SuggestedAction] = [],
+    *,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    batch: bool = False,
+    batch_window: float = 0.1,
+    **uvicorn_kwargs: Any,
+) -> None:
+    """Serve the agent with uvicorn, using the uvloop event loop and the httptools HTTP parser.
+
+    Both come with `fastapi[standard]` on Linux and macOS, pass `loop="asyncio"` and `http="h11"` to run elsewhere.
+
+    Args:
+        agent: The agent to serve.
+        suggestions: Suggested actions returned by `/api/suggestions`.
+        host: The host to bind to.
+        port: The port to bind to.
+        batch: Whether to collect concurrent `/api/chat` requests and run them together, see `serve_agent`.
+        batch_window: How long, in seconds, to collect requests for a batch when `batch` is enabled.
+        uvicorn_kwargs: Additional keyword arguments passed to `uvicorn.run`.
+    """
+    import uvicorn
+
+    uvicorn_kwargs.setdefault("loop", "uvloop")
+    uvicorn_kwargs.setdefault("http", "httptools")
+    app = serve_agent(agent, suggestions, batch=batch, batch_window=batch_window)
+    uvicorn.run(app, host=host, port=port, **uvicorn_kwargs)
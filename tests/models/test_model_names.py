@@ -0,0 +1,18 @@
+from typing import get_args
+
+import pytest
+
+from liquid_os.exceptions import UserError
+from liquid_os.models import KnownModelName, _find_loader
+
+
+@pytest.mark.parametrize(
+    "model_name", [name for name in get_args(KnownModelName) if name != "test"]
+)
+def test_known_model_name_has_loader(model_name: str):
+    _find_loader(model_name)
+
+
+def test_unknown_model_name():
+    with pytest.raises(UserError, match="Unknown model: foobar:model"):
+        _find_loader("foobar:model")
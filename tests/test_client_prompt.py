@@ -0,0 +1,113 @@
+import pytest
+
+from liquid_os import _client_prompt
+from liquid_os._client_prompt import convert_to_model_messages
+from liquid_os._schema import ClientMessage
+from liquid_os.messages import ModelRequest, ToolReturnPart
+
+
+@pytest.fixture(autouse=True)
+def clear_message_cache():
+    _client_prompt._message_cache.clear()
+    yield
+    _client_prompt._message_cache.clear()
+
+
+def tool_message(**tool: object) -> ClientMessage:
+    invocation = {
+        "toolCallId": "call-1",
+        "toolName": "get_weather",
+        "args": {"city": "Paris"},
+        "state": "result",
+        "result": "sunny",
+    }
+    invocation.update(tool)
+    return ClientMessage(
+        id="msg-1", role="assistant", content="", toolInvocations=[invocation]
+    )
+
+
+def test_cache_hit_reuses_converted_messages():
+    msg = ClientMessage(id="msg-1", role="user", content="hello")
+    _, first = convert_to_model_messages([msg, tool_message()])
+    _, second = convert_to_model_messages(
+        [ClientMessage(id="msg-1", role="user", content="hello"), tool_message()]
+    )
+
+    assert second == first
+    assert all(a is b for a, b in zip(first, second))
+    assert len(_client_prompt._message_cache) == 2
+
+
+def test_lru_eviction(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(_client_prompt, "_MESSAGE_CACHE_SIZE", 2)
+    a, b, c = (
+        ClientMessage(id=name, role="user", content=name) for name in ("a", "b", "c")
+    )
+
+    convert_to_model_messages([a, b])
+    # touch `a` so `b` is the least recently used
+    convert_to_model_messages([a])
+    convert_to_model_messages([c])
+
+    assert list(_client_prompt._message_cache) == [
+        _client_prompt._message_key(a),
+        _client_prompt._message_key(c),
+    ]
+
+
+def test_state_change_under_same_id():
+    _, pending = convert_to_model_messages([tool_message(state="call", result=None)])
+    _, done = convert_to_model_messages([tool_message()])
+
+    assert not any(isinstance(m, ModelRequest) for m in pending)
+    [tool_return] = [m for m in done if isinstance(m, ModelRequest)]
+    [part] = tool_return.parts
+    assert isinstance(part, ToolReturnPart)
+    assert (part.tool_name, part.content, part.tool_call_id) == (
+        "get_weather",
+        "sunny",
+        "call-1",
+    )
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"toolName": "get_time"},
+        {"args": {"city": "London"}},
+        {"result": "rainy"},
+    ],
+)
+def test_tool_invocation_changes_miss_cache(change: dict[str, object]):
+    _, before = convert_to_model_messages([tool_message()])
+    _, after = convert_to_model_messages([tool_message(**change)])
+
+    assert not any(a is b for a, b in zip(before, after))
+    assert len(_client_prompt._message_cache) == 2
+
+
+def nested(depth: int) -> object:
+    value: object = 1
+    for _ in range(depth):
+        value = {"value": value}
+    return value
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        {"args": {"n": 2**70}},
+        {"result": 2**70},
+        {"args": {"value": nested(300)}},
+        {"result": nested(300)},
+    ],
+    ids=["big-int-args", "big-int-result", "deep-args", "deep-result"],
+)
+def test_tool_invocation_values_orjson_cannot_encode(change: dict[str, object]):
+    """msgspec decodes values wider than 64 bits or deeper than 255 levels, so they must not break the cache key."""
+    _, first = convert_to_model_messages([tool_message(**change)])
+    _, second = convert_to_model_messages([tool_message(**change)])
+
+    assert all(a is b for a, b in zip(first, second))
+    assert len(_client_prompt._message_cache) == 1
@@ -0,0 +1,227 @@
+import asyncio
+import gc
+import weakref
+from typing import Any, List, Optional, cast
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from liquid_os import Agent, SuggestedAction, UserError, serve_agent
+from liquid_os import serve as serve_module
+from liquid_os.messages import ModelMessage
+from liquid_os.serve import _BatchGate
+
+WINDOW = 0.01
+
+
+class GatherAgent:
+    def __init__(self) -> None:
+        self.prompts: List[Optional[str]] = []
+
+    async def run(
+        self,
+        user_prompt: Optional[str],
+        message_history: List[ModelMessage],
+        infer_name: bool,
+    ) -> Any:
+        self.prompts.append(user_prompt)
+        if user_prompt == "fail":
+            raise ValueError(user_prompt)
+        return f"run {user_prompt}"
+
+
+class BatchAgent(GatherAgent):
+    def __init__(self, results: Any = None) -> None:
+        super().__init__()
+        self.results = results
+        self.batches: List[List[Optional[str]]] = []
+
+    async def run_batch(self, runs: List[Any]) -> Any:
+        self.batches.append([user_prompt for user_prompt, _ in runs])
+        if self.results is not None:
+            return self.results
+        return [
+            ValueError(user_prompt) if user_prompt == "fail" else f"batch {user_prompt}"
+            for user_prompt, _ in runs
+        ]
+
+
+def batch_gate(agent: GatherAgent) -> _BatchGate:
+    return _BatchGate(cast(Agent, agent), WINDOW)
+
+
+async def run_all(gate: _BatchGate, *prompts: str) -> List[Any]:
+    return await asyncio.wait_for(
+        asyncio.gather(*(gate.run(p, []) for p in prompts), return_exceptions=True),
+        timeout=1,
+    )
+
+
+async def test_batch_gate_gathers_agent_runs():
+    agent = GatherAgent()
+    results = await run_all(batch_gate(agent), "a", "b", "fail")
+
+    assert results[:2] == ["run a", "run b"]
+    assert isinstance(results[2], ValueError)
+    assert agent.prompts == ["a", "b", "fail"]
+
+
+async def test_batch_gate_dispatches_to_run_batch():
+    agent = BatchAgent()
+    gate = batch_gate(agent)
+    results = await run_all(gate, "a", "b", "fail")
+
+    assert results[:2] == ["batch a", "batch b"]
+    assert isinstance(results[2], ValueError)
+    assert agent.batches == [["a", "b", "fail"]]
+    assert agent.prompts == []
+
+    # a later request starts a new batch
+    assert await run_all(gate, "c") == ["batch c"]
+    assert agent.batches == [["a", "b", "fail"], ["c"]]
+
+
+async def test_batch_gate_skips_cancelled_requests():
+    agent = BatchAgent()
+    gate = batch_gate(agent)
+    cancelled = asyncio.create_task(gate.run("a", []))
+    kept = asyncio.create_task(gate.run("b", []))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+
+    assert await asyncio.wait_for(kept, timeout=1) == "batch b"
+    assert cancelled.cancelled()
+    assert agent.batches == [["a", "b"]]
+
+
+@pytest.mark.parametrize("results", [["only one"], [], 42], ids=repr)
+async def test_batch_gate_fails_requests_on_bad_run_batch_results(results: Any):
+    results = await run_all(batch_gate(BatchAgent(results)), "a", "b")
+
+    assert len(results) == 2
+    assert all(isinstance(r, (UserError, TypeError)) for r in results)
+
+
+async def test_batch_gate_fails_requests_when_run_batch_raises():
+    class RaisingAgent(BatchAgent):
+        async def run_batch(self, runs: List[Any]) -> Any:
+            raise RuntimeError("boom")
+
+    results = await run_all(batch_gate(RaisingAgent()), "a", "b")
+
+    assert [str(r) for r in results] == ["boom", "boom"]
+
+
+@pytest.mark.parametrize(
+    "body, error",
+    [
+        (b"", {"type": "missing", "loc": ["body"]}),
+        (b'{"messages": x}', {"type": "json_invalid", "loc": ["body", 13]}),
+        (
+            b'{"messages": [{"role": 1, "content": "hi"}]}',
+            {"type": "value_error", "loc": ["body", "messages", 0, "role"]},
+        ),
+        (
+            b'{"messages": [{"content": "hi"}]}',
+            {"type": "missing", "loc": ["body", "messages", 0, "role"]},
+        ),
+        (b"{}", {"type": "missing", "loc": ["body", "messages"]}),
+    ],
+    ids=["empty", "malformed", "wrong-type", "missing-field", "missing-messages"],
+)
+def test_chat_validation_errors(body: bytes, error: dict[str, Any]):
+    client = TestClient(serve_agent(Agent("test")))
+    response = client.post(
+        "/api/chat", content=body, headers={"content-type": "application/json"}
+    )
+
+    assert response.status_code == 422
+    [detail] = response.json()["detail"]
+    assert {key: detail[key] for key in error} == error
+    assert isinstance(detail["msg"], str)
+
+
+def test_openapi_chat_request_body():
+    client = TestClient(serve_agent(Agent("test")))
+    schema = client.get("/openapi.json").json()
+
+    assert schema["paths"]["/api/chat"]["post"]["requestBody"] == {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {"$ref": "#/components/schemas/RequestSchema"}
+            }
+        },
+    }
+    components = schema["components"]["schemas"]
+    assert components["RequestSchema"]["required"] == ["messages"]
+    assert "ClientMessage" in components
+
+
+def test_serve_agent_reuses_app():
+    agent = Agent("test")
+    suggestions = [SuggestedAction(title="t", label="l", action="a")]
+    app = serve_agent(agent, suggestions, batch=True)
+
+    assert serve_agent(agent, list(suggestions), batch=True) is app
+    assert serve_agent(Agent("test"), suggestions, batch=True) is not app
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"suggestions": [SuggestedAction(title="t", label="l", action="b")]},
+        {"batch": True},
+        {"batch": False, "batch_window": 0.5},
+    ],
+    ids=["suggestions", "batch", "batch_window"],
+)
+def test_serve_agent_rebuilds_app_on_changed_options(options: dict[str, Any]):
+    agent = Agent("test")
+    base: dict[str, Any] = {
+        "suggestions": [SuggestedAction(title="t", label="l", action="a")],
+        "batch": False,
+        "batch_window": 0.1,
+    }
+    app = serve_agent(agent, **base)
+
+    assert serve_agent(agent, **{**base, **options}) is not app
+
+
+def test_serve_agent_rebuilds_app_on_changed_suggestions_in_place():
+    agent = Agent("test")
+    suggestions = [SuggestedAction(title="t", label="l", action="a")]
+    app = serve_agent(agent, suggestions)
+    suggestions[0].action = "b"
+
+    assert serve_agent(agent, suggestions) is not app
+
+
+def test_serve_agent_does_not_keep_agent_alive(monkeypatch: pytest.MonkeyPatch):
+    # FastAPI caches some information about endpoints, which close over the agent, so build apps without them
+    built: List[FastAPI] = []
+
+    def build_app(*args: Any) -> FastAPI:
+        built.append(FastAPI())
+        return built[-1]
+
+    monkeypatch.setattr(serve_module, "_build_app", build_app)
+    agent = Agent("test")
+    key = id(agent)
+    serve_agent(agent)
+    assert key in serve_module._apps
+
+    # the app is only held weakly, so a new one is built once it is gone
+    app_ref = weakref.ref(built.pop())
+    gc.collect()
+    assert app_ref() is None
+    serve_agent(agent)
+    assert len(built) == 1
+    built.clear()
+
+    agent_ref = weakref.ref(agent)
+    del agent
+    gc.collect()
+    assert agent_ref() is None
+    assert key not in serve_module._apps